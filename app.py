@@ -14,6 +14,7 @@ SETUP INSTRUCTIONS
    - DATABASE_URL: PostgreSQL connection string
    - JWT_SECRET_KEY: Secret key for JWT tokens
    - FRONTEND_ORIGIN: Frontend URL (default: http://localhost:5173)
+   - REDIS_URL: (optional) Redis used to cache single products/offers and carts
 
 4) Run the server:
    uvicorn app:app --reload --port 8000
@@ -36,18 +37,26 @@ NOTE: All data is persisted in Postgres database.
 from __future__ import annotations
 
 import os
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
 from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException, Query, Depends
+import orjson
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException, Query, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr, Field
+from sqlalchemy import Integer, bindparam, delete, func, inspect, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
-from database import engine, get_db
+from cache import cache_counter, cache_get, cache_incr, cache_set
+from database import get_db
 from models import Base, User, Product as DBProduct, Offer as DBOffer, CartItem
-from auth import hash_password, verify_password, create_access_token, get_current_user
+from auth import ahash_password, averify_password, password_needs_rehash, create_access_token, get_current_user
 
 # Load environment variables
 load_dotenv()
@@ -74,23 +83,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Serialized JSON for the catalog listings, keyed per filter combination.
+# Products and offers are only edited out-of-band (seed data, NocoDB), so a
+# short TTL bounds how long an edit takes to show up. The same TTL applies to
+# single products/offers cached in Redis.
+CATALOG_CACHE_TTL_SECONDS = int(os.getenv("CATALOG_CACHE_TTL_SECONDS", "30"))
+_catalog_json: TTLCache = TTLCache(maxsize=256, ttl=CATALOG_CACHE_TTL_SECONDS)
+
 
 # =============================================================================
 # STARTUP: CREATE TABLES AND SEED DATA
 # =============================================================================
 
+# Advisory lock key shared by all workers while they run startup
+STARTUP_LOCK_KEY = 725_001
+
+
 @app.on_event("startup")
 async def startup_event():
     """Create database tables and seed initial data on startup."""
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
-    
-    # Seed initial data if tables are empty
     db = next(get_db())
     try:
-        # Check if products exist
-        product_count = db.query(DBProduct).count()
-        if product_count == 0:
+        # Every worker process runs this; a transaction-level advisory lock
+        # makes them take turns so tables and seed rows are created only once.
+        # Released by the commit at the end.
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": STARTUP_LOCK_KEY})
+        conn = db.connection()
+
+        # Create all tables
+        Base.metadata.create_all(bind=conn)
+
+        # create_all() skips tables that already exist, so add any indexes that
+        # were introduced after a table was first created
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+        # Drop the cart constraint and index replaced by ix_cart_user_product_covering
+        # (only after the new unique index exists, so upserts always have one)
+        inspector = inspect(conn)
+        if any(uc["name"] == "uq_user_product" for uc in inspector.get_unique_constraints("cart_items")):
+            conn.execute(text("ALTER TABLE cart_items DROP CONSTRAINT uq_user_product"))
+        if any(ix["name"] == "ix_cart_items_user_id" for ix in inspector.get_indexes("cart_items")):
+            conn.execute(text("DROP INDEX ix_cart_items_user_id"))
+
+        # Seed initial data if tables are empty
+        if db.query(DBProduct.id).first() is None:
             # Seed products
             initial_products = [
                 DBProduct(
@@ -143,11 +181,8 @@ async def startup_event():
                 ),
             ]
             db.add_all(initial_products)
-            db.commit()
-        
-        # Check if offers exist
-        offer_count = db.query(DBOffer).count()
-        if offer_count == 0:
+
+        if db.query(DBOffer.id).first() is None:
             # Seed offers
             initial_offers = [
                 DBOffer(
@@ -176,7 +211,8 @@ async def startup_event():
                 ),
             ]
             db.add_all(initial_offers)
-            db.commit()
+
+        db.commit()
     finally:
         db.close()
 
@@ -220,6 +256,10 @@ class ContactResponse(BaseModel):
     received_at: str
 
 
+class StatusResponse(BaseModel):
+    status: str
+
+
 # ---- Auth models ----
 
 class RegisterRequest(BaseModel):
@@ -250,15 +290,6 @@ class CartItemIn(BaseModel):
     quantity: int = Field(ge=1, le=999)
 
 
-class CartItemOut(BaseModel):
-    product_id: int
-    name: str
-    unit: str
-    unit_price: float
-    quantity: int
-    line_total: float
-
-
 class CartItemSimple(BaseModel):
     """Simplified cart item for GET /api/cart response."""
     product_id: int
@@ -274,20 +305,32 @@ class CartResponse(BaseModel):
     total: float
 
 
-class CartSummary(BaseModel):
-    """Full cart summary with username and timestamp."""
-    username: str
-    items: List[CartItemOut]
-    total: float
-    updated_at: str
-
-
 # =============================================================================
 # AUTH HELPERS (moved to auth.py)
 # =============================================================================
 # All authentication functions are now in auth.py
 
 
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+# (epoch second, formatted timestamp) for the most recent _utc_now_iso() call
+_last_timestamp = (0, "")
+
+
+def _utc_now_iso() -> str:
+    """
+    Current UTC time as an ISO 8601 string, used for response timestamps.
+    Formatted at most once per second; callers in the same second share it.
+    """
+    global _last_timestamp
+    second = int(time.time())
+    if _last_timestamp[0] != second:
+        _last_timestamp = (second, datetime.fromtimestamp(second, timezone.utc).isoformat())
+    return _last_timestamp[1]
+
+
 # =============================================================================
 # PUBLIC ENDPOINTS (NO AUTH)
 # =============================================================================
@@ -299,49 +342,66 @@ async def list_products(
     db: Session = Depends(get_db),
 ):
     """Get list of products from database, optionally filtered by category and availability."""
-    query = db.query(DBProduct)
-    
-    if category:
-        # Case-insensitive exact match for category
-        query = query.filter(DBProduct.category.ilike(category))
-    
-    if available_only:
-        query = query.filter(DBProduct.is_available == True)
-    
-    db_products = query.all()
-    
-    # Convert SQLAlchemy models to Pydantic models
-    return [
-        Product(
-            id=p.id,
-            name=p.name,
-            description=p.description,
-            price=float(p.price),
-            unit=p.unit,
-            category=p.category,
-            is_available=p.is_available,
-        )
-        for p in db_products
-    ]
+    cache_key = ("products", category.lower() if category else None, available_only)
+    body = _catalog_json.get(cache_key)
+    if body is None:
+        query = db.query(DBProduct)
+
+        if category:
+            # Case-insensitive exact match for category (uses ix_products_category_lower)
+            query = query.filter(func.lower(DBProduct.category) == category.lower())
+
+        if available_only:
+            query = query.filter(DBProduct.is_available == True)
+
+        db_products = query.all()
+
+        # Build Pydantic models without re-validating stored rows; serialize once
+        body = orjson.dumps([
+            Product.model_construct(
+                id=p.id,
+                name=p.name,
+                description=p.description,
+                price=float(p.price),
+                unit=p.unit,
+                category=p.category,
+                is_available=p.is_available,
+            ).model_dump()
+            for p in db_products
+        ])
+        _catalog_json[cache_key] = body
+
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/api/products/{product_id}", response_model=Product)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
-    """Get a single product by ID from database."""
-    db_product = db.query(DBProduct).filter(DBProduct.id == product_id).first()
-    if not db_product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
-    # Convert SQLAlchemy model to Pydantic model
-    return Product(
-        id=db_product.id,
-        name=db_product.name,
-        description=db_product.description,
-        price=float(db_product.price),
-        unit=db_product.unit,
-        category=db_product.category,
-        is_available=db_product.is_available,
-    )
+def get_product(product_id: int, db: Session = Depends(get_db)):
+    """
+    Get a single product by ID.
+    Served from the Redis cache when present; otherwise read from database and cached.
+    """
+    cache_key = f"product:{product_id}"
+    body = cache_get(cache_key)
+    if body is None:
+        db_product = db.get(DBProduct, product_id)
+        if not db_product:
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        # Stored rows are already valid, so skip Pydantic validation on the way out
+        body = orjson.dumps(
+            Product.model_construct(
+                id=db_product.id,
+                name=db_product.name,
+                description=db_product.description,
+                price=float(db_product.price),
+                unit=db_product.unit,
+                category=db_product.category,
+                is_available=db_product.is_available,
+            ).model_dump()
+        )
+        cache_set(cache_key, body, CATALOG_CACHE_TTL_SECONDS)
+
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/api/offers", response_model=List[Offer])
@@ -350,45 +410,62 @@ async def list_offers(
     db: Session = Depends(get_db),
 ):
     """Get list of offers from database. Returns active offers by default."""
-    query = db.query(DBOffer)
-    
-    if not include_inactive:
-        query = query.filter(DBOffer.is_active == True)
-    
-    db_offers = query.all()
-    
-    # Convert SQLAlchemy models to Pydantic models
-    return [
-        Offer(
-            id=o.id,
-            title=o.title,
-            description=o.description,
-            old_price=float(o.old_price),
-            new_price=float(o.new_price),
-            product_id=o.product_id,
-            is_active=o.is_active,
-        )
-        for o in db_offers
-    ]
+    cache_key = ("offers", include_inactive)
+    body = _catalog_json.get(cache_key)
+    if body is None:
+        query = db.query(DBOffer)
+
+        if not include_inactive:
+            query = query.filter(DBOffer.is_active == True)
+
+        db_offers = query.all()
+
+        # Build Pydantic models without re-validating stored rows; serialize once
+        body = orjson.dumps([
+            Offer.model_construct(
+                id=o.id,
+                title=o.title,
+                description=o.description,
+                old_price=float(o.old_price),
+                new_price=float(o.new_price),
+                product_id=o.product_id,
+                is_active=o.is_active,
+            ).model_dump()
+            for o in db_offers
+        ])
+        _catalog_json[cache_key] = body
+
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/api/offers/{offer_id}", response_model=Offer)
-async def get_offer(offer_id: int, db: Session = Depends(get_db)):
-    """Get a single offer by ID from database."""
-    db_offer = db.query(DBOffer).filter(DBOffer.id == offer_id).first()
-    if not db_offer:
-        raise HTTPException(status_code=404, detail="Offer not found")
-    
-    # Convert SQLAlchemy model to Pydantic model
-    return Offer(
-        id=db_offer.id,
-        title=db_offer.title,
-        description=db_offer.description,
-        old_price=float(db_offer.old_price),
-        new_price=float(db_offer.new_price),
-        product_id=db_offer.product_id,
-        is_active=db_offer.is_active,
-    )
+def get_offer(offer_id: int, db: Session = Depends(get_db)):
+    """
+    Get a single offer by ID.
+    Served from the Redis cache when present; otherwise read from database and cached.
+    """
+    cache_key = f"offer:{offer_id}"
+    body = cache_get(cache_key)
+    if body is None:
+        db_offer = db.get(DBOffer, offer_id)
+        if not db_offer:
+            raise HTTPException(status_code=404, detail="Offer not found")
+
+        # Stored rows are already valid, so skip Pydantic validation on the way out
+        body = orjson.dumps(
+            Offer.model_construct(
+                id=db_offer.id,
+                title=db_offer.title,
+                description=db_offer.description,
+                old_price=float(db_offer.old_price),
+                new_price=float(db_offer.new_price),
+                product_id=db_offer.product_id,
+                is_active=db_offer.is_active,
+            ).model_dump()
+        )
+        cache_set(cache_key, body, CATALOG_CACHE_TTL_SECONDS)
+
+    return Response(content=body, media_type="application/json")
 
 
 @app.post("/api/contact", response_model=ContactResponse)
@@ -398,7 +475,7 @@ async def contact(message: ContactMessage):
     return ContactResponse(
         status="ok",
         message="Thank you for contacting Mini Market.",
-        received_at=datetime.utcnow().isoformat(),
+        received_at=_utc_now_iso(),
     )
 
 
@@ -406,19 +483,19 @@ async def contact(message: ContactMessage):
 # AUTH ENDPOINTS
 # =============================================================================
 
-@app.post("/api/auth/register")
+@app.post("/api/auth/register", response_model=StatusResponse)
 async def register(req: RegisterRequest, db: Session = Depends(get_db)):
     username = req.username.strip()
     
-    # Check if username already exists
-    existing_user = db.query(User).filter(User.username.ilike(username)).first()
+    # Check if username already exists (case-insensitive, uses ix_users_username_lower)
+    existing_user = db.query(User).filter(func.lower(User.username) == username.lower()).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
 
     # Create new user with hashed password
     user = User(
         username=username,
-        password_hash=hash_password(req.password),
+        password_hash=await ahash_password(req.password),
     )
     db.add(user)
     db.commit()
@@ -435,11 +512,18 @@ async def login(req: LoginRequest, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
-    if not verify_password(req.password, user.password_hash):
+    if not await averify_password(req.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
+    user_id = user.id  # read before a rehash commit expires `user`
+
+    # Upgrade legacy bcrypt hashes now that we have the plain password
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = await ahash_password(req.password)
+        db.commit()
+
     # Create JWT token
-    access_token = create_access_token(data={"sub": username})
+    access_token = create_access_token(data={"sub": str(user_id), "username": username})
     return AuthResponse(access_token=access_token, username=username)
 
 
@@ -448,7 +532,7 @@ async def me(current_user: User = Depends(get_current_user)):
     return MeResponse(id=current_user.id, username=current_user.username)
 
 
-@app.post("/api/auth/logout")
+@app.post("/api/auth/logout", response_model=StatusResponse)
 async def logout(current_user: User = Depends(get_current_user)):
     """
     Logout endpoint (stateless JWT).
@@ -462,74 +546,138 @@ async def logout(current_user: User = Depends(get_current_user)):
 # CART ENDPOINTS (AUTH REQUIRED, PER-USER)
 # =============================================================================
 
-def _get_cart_items(user: User, db: Session) -> tuple[List[CartItemSimple], float]:
-    """Get cart items and total for current user."""
-    cart_items = db.query(CartItem).filter(CartItem.user_id == user.id).all()
-    items: List[CartItemSimple] = []
-    total = 0.0
+# GET /api/cart bodies cached in Redis per user. Mutations through this API
+# invalidate right away; the TTL only bounds out-of-band edits (e.g. prices).
+CART_CACHE_TTL_SECONDS = int(os.getenv("CART_CACHE_TTL_SECONDS", "300"))
+# Per-user cart version counters outlive every body cached under them, so an
+# expired counter restarting at 0 can never resurface an old body
+CART_VERSION_TTL_SECONDS = max(86400, 2 * CART_CACHE_TTL_SECONDS)
+
+# Cart statements are built once; per-request values are bound by name, so each
+# call reuses the same statement and its cached compiled SQL.
+# Columns are named and ordered like CartItemSimple, so the rows serialize as-is
+_CART_ITEMS_BY_USER = (
+    select(
+        CartItem.product_id,
+        DBProduct.name,
+        DBProduct.price,
+        CartItem.quantity,
+        (DBProduct.price * CartItem.quantity).label("line_total"),
+    )
+    .join(DBProduct, DBProduct.id == CartItem.product_id)
+    .where(CartItem.user_id == bindparam("uid"))
+    .order_by(CartItem.id)
+)
 
-    for cart_item in cart_items:
-        product = cart_item.product
-        if not product:
-            continue
-        unit_price = float(product.price)
-        line_total = round(unit_price * cart_item.quantity, 2)
-        total += line_total
-        items.append(
-            CartItemSimple(
-                product_id=product.id,
-                name=product.name,
-                price=unit_price,
-                quantity=cart_item.quantity,
-                line_total=line_total,
-            )
-        )
+# Inserts only when the product exists and is available, so the availability
+# check and the upsert share one round-trip; no returned row means neither.
+_UPSERT_CART_ITEM = pg_insert(CartItem).from_select(
+    [CartItem.user_id, CartItem.product_id, CartItem.quantity],
+    select(
+        bindparam("uid", type_=Integer),
+        DBProduct.id,
+        bindparam("qty", type_=Integer),
+    ).where(DBProduct.id == bindparam("pid"), DBProduct.is_available),
+)
+_UPSERT_CART_ITEM = (
+    _UPSERT_CART_ITEM.on_conflict_do_update(
+        index_elements=[CartItem.user_id, CartItem.product_id],
+        set_={"quantity": CartItem.quantity + _UPSERT_CART_ITEM.excluded.quantity},
+    )
+    .returning(CartItem.id)
+    # Run as a plain statement: the ORM would otherwise read the bound
+    # parameters as rows for a bulk insert
+    .execution_options(dml_strategy="raw")
+)
 
-    total = round(total, 2)
-    return items, total
+_UPDATE_CART_ITEM_QUANTITY = (
+    update(CartItem)
+    .where(CartItem.user_id == bindparam("uid"), CartItem.product_id == bindparam("pid"))
+    .values(quantity=bindparam("qty"))
+    .execution_options(synchronize_session=False)
+)
 
+_DELETE_CART_ITEM = (
+    delete(CartItem)
+    .where(CartItem.user_id == bindparam("uid"), CartItem.product_id == bindparam("pid"))
+    .execution_options(synchronize_session=False)
+)
 
-def _cart_summary(user: User, db: Session) -> CartSummary:
-    """Build full cart summary from database cart items."""
-    cart_items = db.query(CartItem).filter(CartItem.user_id == user.id).all()
-    items: List[CartItemOut] = []
-    total = 0.0
 
-    for cart_item in cart_items:
-        product = cart_item.product
-        if not product:
-            continue
-        unit_price = float(product.price)
-        line_total = round(unit_price * cart_item.quantity, 2)
-        total += line_total
-        items.append(
-            CartItemOut(
-                product_id=product.id,
-                name=product.name,
-                unit=product.unit,
-                unit_price=unit_price,
-                quantity=cart_item.quantity,
-                line_total=line_total,
-            )
-        )
+def _cart_version_key(user_id: int) -> str:
+    return f"cart_ver:{user_id}"
+
 
-    total = round(total, 2)
-    updated_at = datetime.utcnow().isoformat()
-    return CartSummary(username=user.username, items=items, total=total, updated_at=updated_at)
+def _cart_cache_key(user_id: int) -> Optional[str]:
+    """
+    Key for the user's cached cart body at the current cart version, or None
+    when the version can't be read and the cache must not be used.
+
+    Read this before loading the cart from the database: a mutation that commits
+    meanwhile bumps the version, so a body rendered from the older rows is stored
+    under a key no later reader will look up. A failed version read is not
+    treated as version 0, which could still hold a body from before the first
+    mutation.
+    """
+    version = cache_counter(_cart_version_key(user_id))
+    if version is None:
+        return None
+    return f"cart:{user_id}:{version}"
+
+
+def _commit_cart_change(user: User, db: Session) -> None:
+    """Commit a cart mutation, then bump the user's cart version in the cache."""
+    version_key = _cart_version_key(user.id)  # read before commit() expires `user`
+    db.commit()
+    cache_incr(version_key, CART_VERSION_TTL_SECONDS)
+
+
+def _cart_total(lines: List[Row]) -> float:
+    """Sum the exact line totals; convert to float only for the response."""
+    return float(sum((line.line_total for line in lines), Decimal("0")))
+
+
+def _cart_json(user: User, db: Session) -> bytes:
+    """
+    Render the user's cart as a CartResponse JSON body.
+
+    One joined SELECT whose rows already match CartItemSimple, so they go
+    straight to orjson without building Pydantic models. Prices and line totals
+    come back as Decimal, computed by Postgres in exact NUMERIC arithmetic, and
+    become floats only on the way out.
+    """
+    rows = db.execute(_CART_ITEMS_BY_USER, {"uid": user.id}).all()
+    return orjson.dumps(
+        {"items": [row._asdict() for row in rows], "total": _cart_total(rows)},
+        default=float,
+    )
 
 
 @app.get("/api/cart", response_model=CartResponse)
-async def get_cart(
+def get_cart(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Get cart items for current authenticated user."""
-    items, total = _get_cart_items(current_user, db)
-    return CartResponse(items=items, total=total)
+    """
+    Get cart items for current authenticated user.
+    Served from the Redis cache when present; cart mutations invalidate it by
+    bumping the user's cart version.
+    """
+    cache_key = _cart_cache_key(current_user.id)
+    if cache_key is None:
+        # Cache disabled or unreachable: serve straight from Postgres
+        body = _cart_json(current_user, db)
+    else:
+        body = cache_get(cache_key)
+        if body is None:
+            body = _cart_json(current_user, db)
+            cache_set(cache_key, body, CART_CACHE_TTL_SECONDS)
+
+    return Response(content=body, media_type="application/json")
 
 
 @app.post("/api/cart/items", response_model=CartResponse)
-async def add_cart_item(
+def add_cart_item(
     item: CartItemIn,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -538,37 +686,32 @@ async def add_cart_item(
     Add or update item in cart (upsert).
     If item exists, increases quantity; otherwise creates new cart item.
     """
-    product = db.query(DBProduct).filter(DBProduct.id == item.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    if not product.is_available:
-        raise HTTPException(status_code=400, detail=f"Product '{product.name}' is currently not available")
-
-    # Check if cart item already exists (unique constraint on user_id, product_id)
-    cart_item = db.query(CartItem).filter(
-        CartItem.user_id == current_user.id,
-        CartItem.product_id == item.product_id
+    # Single atomic upsert (unique index on user_id, product_id):
+    # creates the cart item or increases the existing quantity
+    upserted = db.execute(
+        _UPSERT_CART_ITEM,
+        {"uid": current_user.id, "pid": item.product_id, "qty": item.quantity},
     ).first()
+    if upserted is None:
+        # Nothing written: look the product up only to pick the right error
+        product = db.get(DBProduct, item.product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        raise HTTPException(status_code=400, detail=f"Product '{product.name}' is currently not available")
 
-    if cart_item:
-        # Update quantity (upsert behavior: increase existing)
-        cart_item.quantity += item.quantity
-    else:
-        # Create new cart item
-        cart_item = CartItem(
-            user_id=current_user.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-        )
-        db.add(cart_item)
-    
-    db.commit()
-    items, total = _get_cart_items(current_user, db)
-    return CartResponse(items=items, total=total)
+    # Render the cart inside the same transaction; commit() expires loaded
+    # objects, so reading afterwards would re-SELECT current_user first
+    body = _cart_json(current_user, db)
+    _commit_cart_change(current_user, db)
+    return Response(content=body, media_type="application/json")
 
 
-@app.patch("/api/cart/items/{product_id}", response_model=CartResponse)
-async def update_cart_item(
+@app.patch(
+    "/api/cart/items/{product_id}",
+    response_model=CartResponse,
+    responses={204: {"description": "Item removed (quantity 0); fetch GET /api/cart for the new state"}},
+)
+def update_cart_item(
     product_id: int,
     quantity: int = Query(..., ge=0, le=999),
     current_user: User = Depends(get_current_user),
@@ -576,55 +719,57 @@ async def update_cart_item(
 ):
     """
     Update cart item quantity.
-    If quantity <= 0, removes the item from cart.
+    If quantity <= 0, removes the item from cart and returns 204 No Content.
     """
-    cart_item = db.query(CartItem).filter(
-        CartItem.user_id == current_user.id,
-        CartItem.product_id == product_id
-    ).first()
-    
-    if not cart_item:
-        raise HTTPException(status_code=404, detail="Item not found in cart")
-    
+    params = {"uid": current_user.id, "pid": product_id}
     if quantity <= 0:
         # Remove item if quantity is 0 or negative
-        db.delete(cart_item)
+        stmt = _DELETE_CART_ITEM
     else:
         # Update quantity
-        cart_item.quantity = quantity
-    
-    db.commit()
-    items, total = _get_cart_items(current_user, db)
-    return CartResponse(items=items, total=total)
+        stmt = _UPDATE_CART_ITEM_QUANTITY
+        params["qty"] = quantity
+
+    # One statement; the affected row count tells us whether the item existed
+    result = db.execute(stmt, params)
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Item not found in cart")
+
+    if stmt is _DELETE_CART_ITEM:
+        # Removals don't re-render the cart; the client drops the line itself
+        _commit_cart_change(current_user, db)
+        return Response(status_code=204)
 
+    # Render before commit so the response needs no extra round-trips
+    body = _cart_json(current_user, db)
+    _commit_cart_change(current_user, db)
+    return Response(content=body, media_type="application/json")
 
-@app.delete("/api/cart/items/{product_id}", response_model=CartResponse)
-async def remove_cart_item(
+
+@app.delete("/api/cart/items/{product_id}", status_code=204)
+def remove_cart_item(
     product_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Remove item from cart if it exists."""
-    cart_item = db.query(CartItem).filter(
-        CartItem.user_id == current_user.id,
-        CartItem.product_id == product_id
-    ).first()
-    
-    if not cart_item:
+    """
+    Remove item from cart if it exists.
+    Returns 204 No Content; fetch GET /api/cart for the updated cart.
+    """
+    result = db.execute(_DELETE_CART_ITEM, {"uid": current_user.id, "pid": product_id})
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Item not found in cart")
-    
-    db.delete(cart_item)
-    db.commit()
-    items, total = _get_cart_items(current_user, db)
-    return CartResponse(items=items, total=total)
+
+    _commit_cart_change(current_user, db)
+    return Response(status_code=204)
 
 
 # =============================================================================
 # BACKWARD COMPATIBILITY ENDPOINTS
 # =============================================================================
 
-@app.post("/api/cart")
-async def add_to_cart_backward_compat(
+@app.post("/api/cart", response_model=CartResponse)
+def add_to_cart_backward_compat(
     item: CartItemIn,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -635,9 +780,16 @@ async def add_to_cart_backward_compat(
     Prefer using /api/cart/items for new code.
     """
     # Reuse the add_cart_item logic
-    return await add_cart_item(item, current_user, db)
+    return add_cart_item(item, current_user, db)
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="auto",  # uvloop/httptools when installed (not on Windows)
+        http="auto",
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+    )
@@ -1,9 +1,15 @@
 """
 Authentication utilities for JWT-based auth.
 """
+import asyncio
+import hashlib
+import hmac
 import os
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import Optional
+from cachetools import TTLCache
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, Header, Depends
@@ -11,23 +17,95 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import User
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Argon2 cost parameters. Lower them in dev/tests (e.g. ARGON2_TIME_COST=1,
+# ARGON2_MEMORY_COST=8192); hashes made with other values are upgraded on login.
+# Every hash in flight holds ARGON2_MEMORY_COST of RAM, so peak hashing memory is
+# workers x PASSWORD_HASH_THREADS x ARGON2_MEMORY_COST (4 x 2 x 64 MiB = 512 MiB).
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+
+# Concurrent password hashes per worker process; further logins queue
+PASSWORD_HASH_THREADS = int(os.getenv("PASSWORD_HASH_THREADS", "2"))
+
+# Password hashing context. New hashes use argon2id (libargon2 via argon2-cffi);
+# bcrypt stays listed so existing hashes still verify and get upgraded on login.
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=1,
+)
 
 # JWT settings
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "CHANGE_ME_IN_PRODUCTION")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 7
 
+# Successful password checks, keyed on (HMAC of the password, stored hash).
+# Repeat logins skip the KDF work; a changed hash never matches an old entry.
+PASSWORD_CACHE_SIZE = 1024
+PASSWORD_CACHE_TTL_SECONDS = 300
+_verified_passwords: TTLCache = TTLCache(maxsize=PASSWORD_CACHE_SIZE, ttl=PASSWORD_CACHE_TTL_SECONDS)
+_verified_passwords_lock = threading.Lock()
+
+# Validated tokens, mapped to (user id, exp timestamp). A hit skips the JWT
+# signature check and the username lookup; entries never outlive the token.
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL_SECONDS = 60
+_token_cache: TTLCache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+_token_cache_lock = threading.Lock()
+
+# Hashing runs on its own small pool so it never blocks the event loop
+# (argon2-cffi and bcrypt release the GIL). It is sized per worker and kept
+# bounded: with one worker per CPU, a login flood still uses at most
+# PASSWORD_HASH_THREADS hashes per process instead of exhausting memory.
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_THREADS, thread_name_prefix="password")
+
 
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
+    """Hash a password using argon2id."""
     return pwd_context.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    """
+    Verify a password against its hash.
+
+    Successful checks are remembered for a few minutes so repeat logins don't
+    pay for the KDF again. The cache never holds the plain password, only an
+    HMAC of it keyed with the server secret.
+    """
+    cache_key = (
+        hmac.new(SECRET_KEY.encode(), plain_password.encode(), hashlib.sha256).digest(),
+        hashed_password,
+    )
+    with _verified_passwords_lock:
+        if cache_key in _verified_passwords:
+            return True
+
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False
+    with _verified_passwords_lock:
+        _verified_passwords[cache_key] = True
+    return True
+
+
+async def ahash_password(password: str) -> str:
+    """Hash a password on the password thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_pool, hash_password, password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_pool, verify_password, plain_password, hashed_password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Return True if the hash uses a deprecated scheme or outdated parameters."""
+    return pwd_context.needs_update(hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -35,7 +113,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     Create a JWT access token.
     
     Args:
-        data: Dictionary containing data to encode (e.g., {"sub": username})
+        data: Dictionary containing data to encode (e.g., {"sub": str(user.id), "username": username})
         expires_delta: Optional expiration time delta. Defaults to 7 days.
     
     Returns:
@@ -43,9 +121,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     """
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
+        expire = datetime.now(timezone.utc) + timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
     
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
@@ -68,22 +146,32 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Extract token from "Bearer <token>"
-    parts = authorization.split()
-    if len(parts) != 2 or parts[0].lower() != "bearer":
+    # Extract token from "Bearer <token>": exactly two whitespace-separated parts
+    parts = authorization.split(maxsplit=1)
+    token = parts[1].rstrip() if len(parts) == 2 else ""
+    if not token or parts[0].lower() != "bearer" or any(c.isspace() for c in token):
         raise HTTPException(
             status_code=401,
             detail="Invalid authentication header format",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    token = parts[1]
-    
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+    if cached is not None:
+        user_id, expires_at = cached
+        if expires_at > datetime.now(timezone.utc).timestamp():
+            user = db.get(User, user_id)
+            if user is not None:
+                return user
+        with _token_cache_lock:
+            _token_cache.pop(token, None)
+
     try:
         # Decode and verify JWT
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+        subject: str = payload.get("sub")
+        if subject is None:
             raise HTTPException(status_code=401, detail="Invalid token payload")
     except JWTError:
         raise HTTPException(
@@ -92,9 +180,18 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Get user from database
-    user = db.query(User).filter(User.username == username).first()
+    # Get user from database: sub is the user id; tokens issued before the
+    # "username" claim was added carry the username in sub instead
+    if "username" in payload:
+        if not subject.isdigit():
+            raise HTTPException(status_code=401, detail="Invalid token payload")
+        user = db.get(User, int(subject))
+    else:
+        user = db.query(User).filter(User.username == subject).first()
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
+
+    with _token_cache_lock:
+        _token_cache[token] = (user.id, payload["exp"])
     
     return user
@@ -0,0 +1,75 @@
+"""
+Redis cache configuration and helpers.
+
+Caching is optional: when REDIS_URL is not set, or Redis cannot be reached,
+every helper behaves like a cache miss and callers fall back to Postgres.
+"""
+import os
+from typing import Optional
+
+import redis
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Get REDIS_URL from environment; no URL means caching is disabled
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Create client (connections are opened lazily from its pool)
+redis_client: Optional[redis.Redis] = (
+    redis.Redis.from_url(
+        REDIS_URL,
+        socket_connect_timeout=0.25,  # Don't let a dead cache stall requests
+        socket_timeout=0.25,
+    )
+    if REDIS_URL
+    else None
+)
+
+
+def cache_get(key: str) -> Optional[bytes]:
+    """Return the cached bytes for key, or None on a miss or if Redis is unavailable."""
+    if redis_client is None:
+        return None
+    try:
+        return redis_client.get(key)
+    except redis.RedisError:
+        return None
+
+
+def cache_set(key: str, value: bytes, ttl_seconds: int) -> None:
+    """Store value under key with an expiry. Errors are ignored."""
+    if redis_client is None:
+        return
+    try:
+        redis_client.setex(key, ttl_seconds, value)
+    except redis.RedisError:
+        pass
+
+
+def cache_counter(key: str) -> Optional[int]:
+    """
+    Return the counter stored at key (0 when the key is missing), or None if
+    Redis is disabled or unavailable, so callers can tell the two apart.
+    """
+    if redis_client is None:
+        return None
+    try:
+        value = redis_client.get(key)
+    except redis.RedisError:
+        return None
+    return int(value) if value is not None else 0
+
+
+def cache_incr(key: str, ttl_seconds: int) -> None:
+    """Increment the counter at key and (re)set its expiry. Errors are ignored."""
+    if redis_client is None:
+        return
+    try:
+        pipe = redis_client.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, ttl_seconds)
+        pipe.execute()
+    except redis.RedisError:
+        pass
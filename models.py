@@ -3,7 +3,7 @@ SQLAlchemy database models for Mini Market API.
 """
 from datetime import datetime
 from sqlalchemy import (
-    Column, Integer, String, Numeric, Boolean, ForeignKey, DateTime, UniqueConstraint, Index
+    Column, Integer, String, Numeric, Boolean, ForeignKey, DateTime, Index
 )
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql import func
@@ -17,7 +17,7 @@ class User(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, nullable=False, index=True)
-    password_hash = Column(String(255), nullable=False)  # bcrypt hash (includes salt)
+    password_hash = Column(String(255), nullable=False)  # argon2id or legacy bcrypt hash (includes salt)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     # Relationships
@@ -27,6 +27,10 @@ class User(Base):
         return f"<User(id={self.id}, username='{self.username}')>"
 
 
+# Supports the case-insensitive "username taken" check on register
+Index("ix_users_username_lower", func.lower(User.username))
+
+
 class Product(Base):
     """Product model representing items in the supermarket."""
     __tablename__ = "products"
@@ -40,13 +44,20 @@ class Product(Base):
     is_available = Column(Boolean, default=True, nullable=False)
 
     # Relationships
-    cart_items = relationship("CartItem", back_populates="product")
+    # Never lazy-loaded: cart lines are read with explicit queries, so touching
+    # this by accident raises instead of issuing a query per product.
+    # passive_deletes leaves removing cart rows to the FK's ON DELETE CASCADE.
+    cart_items = relationship("CartItem", back_populates="product", lazy="raise", passive_deletes=True)
     offers = relationship("Offer", back_populates="product")
 
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name}')>"
 
 
+# Supports the case-insensitive category filter on GET /api/products
+Index("ix_products_category_lower", func.lower(Product.category))
+
+
 class Offer(Base):
     """Offer model representing discounts and special deals."""
     __tablename__ = "offers"
@@ -75,15 +86,22 @@ class CartItem(Base):
     product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
     quantity = Column(Integer, nullable=False)
 
-    # Unique constraint: one cart item per user-product combination
+    # One cart item per user-product combination. The index leads with user_id,
+    # so it also serves per-user cart reads; INCLUDE carries the remaining
+    # columns those reads need, letting Postgres answer them from the index.
     __table_args__ = (
-        UniqueConstraint("user_id", "product_id", name="uq_user_product"),
-        Index("ix_cart_items_user_id", "user_id"),
+        Index(
+            "ix_cart_user_product_covering",
+            "user_id",
+            "product_id",
+            unique=True,
+            postgresql_include=["quantity", "id"],
+        ),
     )
 
     # Relationships
     user = relationship("User", back_populates="cart_items")
-    product = relationship("Product", back_populates="cart_items")
+    product = relationship("Product", back_populates="cart_items", lazy="joined")  # always needed with the item
 
     def __repr__(self):
         return f"<CartItem(id={self.id}, user_id={self.user_id}, product_id={self.product_id}, quantity={self.quantity})>"